@@ -0,0 +1,309 @@
+# beeplan/core/constraints.py
+from typing import Dict, List, Set, Tuple
+from collections import defaultdict
+from .models import Schedule, Course, Instructor, Room, CommonSchedule, Placement, Program, Violation, TimeSlot
+from .timegrid import DAYS, DAY_INDEX, interned_slot
+
+def no_friday_exam_period(schedule: Schedule, common: CommonSchedule) -> List[Violation]:
+    fmask = common.forbidden_mask_by_day()
+    out: List[Violation] = []
+    for p in schedule.placements:
+        m = fmask.get(p.slot.day)
+        if m is not None and m & (1 << p.slot.index):
+            out.append(Violation("FORBIDDEN_SLOT",
+                f"{p.atom.course_id} in forbidden Fri slot {p.slot.index}",
+                severity="hard", slot=p.slot, course_ids=[p.atom.course_id], room_id=p.room_id))
+    return out
+
+def room_type_capacity(schedule: Schedule, courses: Dict[str, Course], rooms: Dict[str, Room]) -> List[Violation]:
+    out: List[Violation] = []
+    for p in schedule.placements:
+        c = courses[p.atom.course_id]; r = rooms[p.room_id]
+        is_lab = p.atom.session_type == "lab"
+        if is_lab:
+            if r.type != "lab":
+                out.append(Violation("ROOM_TYPE", f"Lab in non-lab room {r.name}",
+                                     severity="hard", slot=p.slot, course_ids=[c.id], room_id=r.id))
+            if r.capacity > 40:
+                out.append(Violation("LAB_CAPACITY", f"Lab capacity exceeds 40 in {r.name} ({r.capacity})",
+                                     severity="hard", slot=p.slot, course_ids=[c.id], room_id=r.id))
+        else:
+            if r.type != "theory":
+                out.append(Violation("ROOM_TYPE", f"Theory in lab room {r.name}",
+                                     severity="hard", slot=p.slot, course_ids=[c.id], room_id=r.id))
+            # Optional theory capacity vs expected students
+            if c.expected_students and r.capacity < c.expected_students:
+                out.append(Violation("ROOM_CAPACITY",
+                                     f"Room {r.name} capacity {r.capacity} < expected {c.expected_students}",
+                                     severity="hard", slot=p.slot, course_ids=[c.id], room_id=r.id))
+    return out
+
+def instructor_overlap_daily_cap(schedule: Schedule, instructors: Dict[str, Instructor]) -> List[Violation]:
+    out: List[Violation] = []
+    # Overlaps are rare: remember the first course per (ins, day, idx) and
+    # only allocate a list when a second one actually lands on the same key.
+    first_cid: Dict[Tuple[str, str, int], str] = {}
+    extra_cids: Dict[Tuple[str, str, int], List[str]] = {}
+    theory_hours: Dict[Tuple[str, str], int] = defaultdict(int)
+    for p in schedule.placements:
+        k = (p.atom.instructor_id, p.slot.day, p.slot.index)
+        if k in first_cid:
+            extra_cids.setdefault(k, []).append(p.atom.course_id)
+        else:
+            first_cid[k] = p.atom.course_id
+        if p.atom.session_type == "theory":
+            theory_hours[(p.atom.instructor_id, p.slot.day)] += 1
+    if extra_cids:
+        for (ins, day, idx), cid0 in first_cid.items():
+            more = extra_cids.get((ins, day, idx))
+            if more:
+                out.append(Violation("INSTRUCTOR_OVERLAP",
+                                     f"Instructor {ins} overlap at {day}-{idx}",
+                                     severity="hard", slot=interned_slot(day, idx),
+                                     instructor_id=ins, course_ids=[cid0, *more]))
+    for (ins, day), hours in theory_hours.items():
+        cap = instructors[ins].max_daily_theory_hours
+        if hours > cap:
+            out.append(Violation("INSTRUCTOR_THEORY_CAP",
+                                 f"Instructor {ins} exceeds {cap} theory hours on {day} ({hours})",
+                                 severity="hard", instructor_id=ins))
+    return out
+
+def lab_after_theory(schedule: Schedule) -> List[Violation]:
+    out: List[Violation] = []
+    earliest_theory: Dict[str, int] = {}
+    earliest_lab: Dict[str, int] = {}
+    for p in schedule.placements:
+        track = earliest_theory if p.atom.session_type == "theory" else earliest_lab
+        prev = track.get(p.atom.course_id)
+        if prev is None or p.slot.index < prev:
+            track[p.atom.course_id] = p.slot.index
+    for cid, lidx in earliest_lab.items():
+        tidx = earliest_theory.get(cid)
+        if tidx is None or lidx <= tidx:
+            out.append(Violation("LAB_AFTER_THEORY", f"Lab before theory for {cid}", severity="hard", course_ids=[cid]))
+    return out
+
+def _course_info(courses: Dict[str, Course]) -> Dict[str, Tuple[int, bool, Program]]:
+    """Flat (year, required, program) triple per course id, built once per
+    validation so the per-slot loops avoid repeated attribute chains."""
+    return {cid: (c.year, c.required, c.program) for cid, c in courses.items()}
+
+_PROGRAM_BIT = {Program.CENG: 1, Program.SENG: 2}
+
+# Cohort mask layout (per slot): year presence in bits 1..4, flags above.
+_C_Y3 = 1 << 3
+_C_DUP = 1 << 5
+_C_ELEC = 1 << 6
+_C_PROG_SHIFT = 7
+_C_PROG_BOTH = 3 << _C_PROG_SHIFT
+
+def _cohort_slot_violations(day: str, idx: int, ps: List[Placement],
+                            info: Dict[str, Tuple[int, bool, Program]],
+                            out: List[Violation]) -> None:
+    # Single pass per slot, allocation-free: years and elective programs are
+    # tracked as small bitmasks instead of a list plus a set.
+    year_mask = prog_mask = 0
+    dup_year = has_y3 = has_elective = False
+    for p in ps:
+        year, required, program = info[p.atom.course_id]
+        ybit = 1 << year
+        if year_mask & ybit:
+            dup_year = True
+        year_mask |= ybit
+        if year == 3:
+            has_y3 = True
+        if not required:
+            has_elective = True
+            prog_mask |= _PROGRAM_BIT[program]
+    if dup_year:
+        out.append(Violation("YEAR_OVERLAP", f"Same-year overlap at {day}-{idx}",
+                             severity="hard", slot=interned_slot(day, idx),
+                             course_ids=[p.atom.course_id for p in ps]))
+    if has_y3 and has_elective:
+        out.append(Violation("Y3_VS_ELECTIVES",
+                             f"3rd-year courses overlap with electives at {day}-{idx}",
+                             severity="hard", slot=interned_slot(day, idx),
+                             course_ids=[p.atom.course_id for p in ps]))
+    if prog_mask == 3:  # both CENG and SENG electives present
+        out.append(Violation("PROGRAM_ELECTIVE_OVERLAP",
+                             f"CENG and SENG electives overlap at {day}-{idx}",
+                             severity="hard", slot=interned_slot(day, idx),
+                             course_ids=[p.atom.course_id for p in ps]))
+
+def cohort_electives(schedule: Schedule, courses: Dict[str, Course]) -> List[Violation]:
+    out: List[Violation] = []
+    info = _course_info(courses)
+    for (day, idx), ps in schedule.by_slot().items():
+        _cohort_slot_violations(day, idx, ps, info, out)
+    return out
+
+def prefer_consecutive_lab(schedule: Schedule, courses: Dict[str, Course]) -> List[Violation]:
+    out: List[Violation] = []
+    # Bit i of the mask marks a lab at slot index i. Two adjacent indices
+    # exist iff mask & (mask >> 1) is non-zero, which matches the old
+    # sort-and-scan (duplicates collapse to one bit and never count as
+    # adjacent, exactly as before).
+    lab_mask: Dict[str, int] = defaultdict(int)
+    lab_count: Dict[str, int] = defaultdict(int)
+    for p in schedule.placements:
+        if p.atom.session_type == "lab":
+            lab_mask[p.atom.course_id] |= 1 << p.slot.index
+            lab_count[p.atom.course_id] += 1
+    for cid, m in lab_mask.items():
+        if lab_count[cid] >= 2 and not (m & (m >> 1)):
+            if courses[cid].prefer_consecutive_lab:
+                out.append(Violation("LAB_NON_CONSECUTIVE",
+                                     f"Lab hours not consecutive for {cid}",
+                                     severity="soft", course_ids=[cid]))
+    return out
+
+def collect_violations(schedule: Schedule,
+                       courses: Dict[str, Course],
+                       instructors: Dict[str, Instructor],
+                       rooms: Dict[str, Room],
+                       common: CommonSchedule) -> List[Violation]:
+    """
+    Fused equivalent of running every constraint function above.
+
+    The placement list is walked once, feeding all aggregates; violations
+    are then emitted from the (much smaller) aggregates in the same order
+    the individual passes would produce them.
+    """
+    # Forbidden slots folded into one bitset over packed codes: the per
+    # placement test is a shift and an AND instead of a tuple-hash lookup.
+    forb_bits = 0
+    for day, m in common.forbidden_mask_by_day().items():
+        forb_bits |= m << (DAY_INDEX[day] << 4)
+    forbidden_v: List[Violation] = []
+    room_v: List[Violation] = []
+    # Aggregates are keyed on a packed int code (day ordinal << 4 | index)
+    # instead of (str, int) tuples; hashing a small int is far cheaper and
+    # the code is unpacked only for the few emitted violations.
+    # Instructor occupancy is one bitset per instructor: a collision is a
+    # single AND, and course details are only gathered if one occurred.
+    instr_occ: Dict[str, int] = {}
+    collided: Set[Tuple[str, int]] = set()
+    # Daily theory hours live in a flat list indexed by instructor ordinal
+    # and day ordinal; both domains are small and fixed, so a list index
+    # replaces hashing an (instructor, day) tuple per theory placement.
+    n_days = len(DAYS)
+    ins_ord = {ins_id: j for j, ins_id in enumerate(instructors)}
+    theory_counts = [0] * (len(instructors) * n_days)
+    earliest_theory: Dict[str, int] = {}
+    earliest_lab: Dict[str, int] = {}
+    lab_mask: Dict[str, int] = defaultdict(int)
+    lab_count: Dict[str, int] = defaultdict(int)
+    # Cohort state is one small int per slot code: year-presence bits 1..4,
+    # then duplicate-year, any-elective and CENG/SENG-elective flags. All
+    # three cohort rules are decided from that mask after the sweep.
+    cohort_mask: Dict[int, int] = {}
+    by_slot: Dict[int, List[Placement]] = {}
+
+    # Method lookups that fire once per placement, bound outside the loop.
+    cohort_get = cohort_mask.get
+    occ_get = instr_occ.get
+    slot_group = by_slot.setdefault
+
+    for p in schedule.placements:
+        atom = p.atom; slot = p.slot; cid = atom.course_id
+        c = courses[cid]; r = rooms[p.room_id]
+        dom = DAY_INDEX[slot.day]
+        code = (dom << 4) | slot.index
+        cm = cohort_get(code, 0)
+        ybit = 1 << c.year
+        if cm & ybit:
+            cm |= _C_DUP
+        cm |= ybit
+        if not c.required:
+            cm |= _C_ELEC | (_PROGRAM_BIT[c.program] << _C_PROG_SHIFT)
+        cohort_mask[code] = cm
+        if forb_bits >> code & 1:
+            forbidden_v.append(Violation("FORBIDDEN_SLOT",
+                f"{cid} in forbidden Fri slot {slot.index}",
+                severity="hard", slot=slot, course_ids=[cid], room_id=p.room_id))
+        if atom.session_type == "lab":
+            if r.type != "lab":
+                room_v.append(Violation("ROOM_TYPE", f"Lab in non-lab room {r.name}",
+                                        severity="hard", slot=slot, course_ids=[cid], room_id=r.id))
+            if r.capacity > 40:
+                room_v.append(Violation("LAB_CAPACITY", f"Lab capacity exceeds 40 in {r.name} ({r.capacity})",
+                                        severity="hard", slot=slot, course_ids=[cid], room_id=r.id))
+            prev = earliest_lab.get(cid)
+            if prev is None or slot.index < prev:
+                earliest_lab[cid] = slot.index
+            lab_mask[cid] |= 1 << slot.index
+            lab_count[cid] += 1
+        else:
+            if r.type != "theory":
+                room_v.append(Violation("ROOM_TYPE", f"Theory in lab room {r.name}",
+                                        severity="hard", slot=slot, course_ids=[cid], room_id=r.id))
+            if c.expected_students and r.capacity < c.expected_students:
+                room_v.append(Violation("ROOM_CAPACITY",
+                                        f"Room {r.name} capacity {r.capacity} < expected {c.expected_students}",
+                                        severity="hard", slot=slot, course_ids=[cid], room_id=r.id))
+            theory_counts[ins_ord[atom.instructor_id] * n_days + dom] += 1
+            prev = earliest_theory.get(cid)
+            if prev is None or slot.index < prev:
+                earliest_theory[cid] = slot.index
+        bit = 1 << code
+        m = occ_get(atom.instructor_id, 0)
+        if m & bit:
+            collided.add((atom.instructor_id, code))
+        else:
+            instr_occ[atom.instructor_id] = m | bit
+        slot_group(code, []).append(p)
+
+    v = forbidden_v
+    v += room_v
+    if collided:
+        groups: Dict[Tuple[str, int], List[str]] = {}
+        for p in schedule.placements:
+            k = (p.atom.instructor_id, (DAY_INDEX[p.slot.day] << 4) | p.slot.index)
+            if k in collided:
+                groups.setdefault(k, []).append(p.atom.course_id)
+        for (ins, code), cids in groups.items():
+            day, idx = DAYS[code >> 4], code & 15
+            v.append(Violation("INSTRUCTOR_OVERLAP",
+                               f"Instructor {ins} overlap at {day}-{idx}",
+                               severity="hard", slot=interned_slot(day, idx),
+                               instructor_id=ins, course_ids=cids))
+    for ins, j in ins_ord.items():
+        cap = instructors[ins].max_daily_theory_hours
+        base = j * n_days
+        for dom in range(n_days):
+            hours = theory_counts[base + dom]
+            if hours > cap:
+                v.append(Violation("INSTRUCTOR_THEORY_CAP",
+                                   f"Instructor {ins} exceeds {cap} theory hours on {DAYS[dom]} ({hours})",
+                                   severity="hard", instructor_id=ins))
+    for cid, lidx in earliest_lab.items():
+        tidx = earliest_theory.get(cid)
+        if tidx is None or lidx <= tidx:
+            v.append(Violation("LAB_AFTER_THEORY", f"Lab before theory for {cid}", severity="hard", course_ids=[cid]))
+    for code, cm in cohort_mask.items():
+        dup = cm & _C_DUP
+        y3_elec = cm & _C_Y3 and cm & _C_ELEC
+        prog_clash = cm & _C_PROG_BOTH == _C_PROG_BOTH
+        if not (dup or y3_elec or prog_clash):
+            continue
+        day, idx = DAYS[code >> 4], code & 15
+        cids = [p.atom.course_id for p in by_slot[code]]
+        if dup:
+            v.append(Violation("YEAR_OVERLAP", f"Same-year overlap at {day}-{idx}",
+                               severity="hard", slot=interned_slot(day, idx), course_ids=list(cids)))
+        if y3_elec:
+            v.append(Violation("Y3_VS_ELECTIVES",
+                               f"3rd-year courses overlap with electives at {day}-{idx}",
+                               severity="hard", slot=interned_slot(day, idx), course_ids=list(cids)))
+        if prog_clash:
+            v.append(Violation("PROGRAM_ELECTIVE_OVERLAP",
+                               f"CENG and SENG electives overlap at {day}-{idx}",
+                               severity="hard", slot=interned_slot(day, idx), course_ids=list(cids)))
+    for cid, m in lab_mask.items():
+        if lab_count[cid] >= 2 and not (m & (m >> 1)):
+            if courses[cid].prefer_consecutive_lab:
+                v.append(Violation("LAB_NON_CONSECUTIVE",
+                                   f"Lab hours not consecutive for {cid}",
+                                   severity="soft", course_ids=[cid]))
+    return v
@@ -1,7 +1,7 @@
 # beeplan/core/models.py
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Literal
+from typing import Dict, FrozenSet, List, Optional, Tuple, Literal
 from enum import Enum
 
 Day = Literal["Mon", "Tue", "Wed", "Thu", "Fri"]
@@ -11,7 +11,7 @@ class Program(str, Enum):
     CENG = "CENG"
     SENG = "SENG"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TimeSlot:
     """
     A discrete weekly slot.
@@ -23,7 +23,7 @@ class TimeSlot:
     day: Day
     index: int
 
-@dataclass
+@dataclass(slots=True)
 class Course:
     """
     Course definition and weekly requirements.
@@ -97,7 +97,34 @@ class CommonSchedule:
     slots_per_day: int
     forbidden_slots: List[TimeSlot] = field(default_factory=list)
 
-@dataclass(frozen=True)
+    def forbidden_set(self) -> FrozenSet[Tuple[Day, int]]:
+        """Cached {(day, index)} view of forbidden_slots, built on first use.
+
+        forbidden_slots is treated as fixed after construction; constraint
+        checks hit this set thousands of times per solve.
+        """
+        cache = getattr(self, "_forbidden_cache", None)
+        if cache is None:
+            cache = frozenset((ts.day, ts.index) for ts in self.forbidden_slots)
+            self._forbidden_cache = cache
+        return cache
+
+    def forbidden_mask_by_day(self) -> Dict[Day, int]:
+        """Forbidden slot indices per day as bitmasks (bit 1 << index).
+
+        Days without forbidden slots are simply absent, so the common case
+        is one failed dict probe instead of hashing a (day, index) tuple
+        per placement.
+        """
+        cache = getattr(self, "_forbidden_mask_cache", None)
+        if cache is None:
+            cache = {}
+            for ts in self.forbidden_slots:
+                cache[ts.day] = cache.get(ts.day, 0) | (1 << ts.index)
+            self._forbidden_mask_cache = cache
+        return cache
+
+@dataclass(frozen=True, slots=True)
 class SessionAtom:
     """
     A single hour of a course to be scheduled (theory or lab).
@@ -108,7 +135,7 @@ class SessionAtom:
     program: Program
     instructor_id: str
 
-@dataclass
+@dataclass(slots=True)
 class Placement:
     """
     A scheduled session atom in a room and timeslot.
@@ -126,15 +153,34 @@ class Placement:
 class Schedule:
     """
     Collection of placements with helpers.
+
+    Mutate through add()/pop_last() so the by_slot() cache stays valid;
+    writing to `placements` directly bypasses the version counter.
     """
     placements: List[Placement] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        self._version = 0
+        self._by_slot_cache: Optional[Dict[Tuple[Day, int], List[Placement]]] = None
+        self._by_slot_version = -1
+
+    def add(self, p: Placement) -> None:
+        self.placements.append(p)
+        self._version += 1
+
+    def pop_last(self) -> Placement:
+        self._version += 1
+        return self.placements.pop()
+
     def by_slot(self) -> Dict[Tuple[Day, int], List[Placement]]:
-        out: Dict[Tuple[Day, int], List[Placement]] = {}
-        for p in self.placements:
-            key = (p.slot.day, p.slot.index)
-            out.setdefault(key, []).append(p)
-        return out
+        if self._by_slot_version != self._version:
+            out: Dict[Tuple[Day, int], List[Placement]] = {}
+            for p in self.placements:
+                key = (p.slot.day, p.slot.index)
+                out.setdefault(key, []).append(p)
+            self._by_slot_cache = out
+            self._by_slot_version = self._version
+        return self._by_slot_cache
 
     def by_instructor(self) -> Dict[str, List[Placement]]:
         out: Dict[str, List[Placement]] = {}
@@ -158,7 +204,7 @@ class BeePlanConfig:
     instructors: List[Instructor]
     rooms: List[Room]
 
-@dataclass
+@dataclass(slots=True)
 class Violation:
     """
     Structured violation for reporting.
@@ -1,11 +1,14 @@
 # beeplan/core/scheduler.py
 from __future__ import annotations
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from itertools import repeat
+from typing import Dict, List, Set, Tuple
 import logging
 
 from .models import (BeePlanConfig, Schedule, ScheduleResult, Violation, Course, Instructor, Room,
                      SessionAtom, Placement, TimeSlot)
+from .timegrid import interned_slot
 from .validate import validate_config
 from .constraints import collect_violations
 from .errors import InvalidInputError, SchedulingError
@@ -17,83 +20,80 @@ class Domain:
     pairs: List[Tuple[TimeSlot, str]]
 
 def build_atoms(courses: List[Course]) -> List[SessionAtom]:
+    # SessionAtom is frozen, so the hours of one (course, type) share a
+    # single instance; repeat() avoids re-reading the course fields per hour.
     atoms: List[SessionAtom] = []
     for c in courses:
-        atoms += [SessionAtom(c.id, "theory", c.year, c.program, c.instructor_id)
-                  for _ in range(c.weekly_theory_hours)]
-        atoms += [SessionAtom(c.id, "lab", c.year, c.program, c.instructor_id)
-                  for _ in range(c.weekly_lab_hours)]
+        atoms.extend(repeat(SessionAtom(c.id, "theory", c.year, c.program, c.instructor_id),
+                            c.weekly_theory_hours))
+        atoms.extend(repeat(SessionAtom(c.id, "lab", c.year, c.program, c.instructor_id),
+                            c.weekly_lab_hours))
     return atoms
 
 def compute_domains(config: BeePlanConfig) -> Dict[SessionAtom, Domain]:
-    rooms_by_type = {"theory": [r for r in config.rooms if r.type == "theory"],
-                     "lab": [r for r in config.rooms if r.type == "lab"]}
-    availability = {ins.id: {(ts.day, ts.index) for ts in ins.availability} for ins in config.instructors}
-    forbidden = {(ts.day, ts.index) for ts in config.common.forbidden_slots}
+    rooms_by_type: Dict[str, List[Room]] = {"theory": [], "lab": []}
+    for r in config.rooms:
+        rooms_by_type[r.type].append(r)
+    courses_by_id = {c.id: c for c in config.courses}
+    # Availability becomes one packed bitmask per instructor (same grid-bit
+    # layout the solver uses), with forbidden cells already cleared, so the
+    # per-atom slot walk is a bit iterator instead of days*slots set probes.
+    days = config.common.days
+    day_index = {d: k for k, d in enumerate(days)}
+    spd = config.common.slots_per_day
+    forb_bits = 0
+    for d, i in config.common.forbidden_set():
+        if d in day_index and 1 <= i <= spd:
+            forb_bits |= 1 << (day_index[d] * spd + i - 1)
+    avail_mask: Dict[str, int] = {}
+    for ins in config.instructors:
+        m = 0
+        for ts in ins.availability:
+            di = day_index.get(ts.day)
+            if di is not None and 1 <= ts.index <= spd:
+                m |= 1 << (di * spd + ts.index - 1)
+        avail_mask[ins.id] = m & ~forb_bits
     domains: Dict[SessionAtom, Domain] = {}
     for atom in build_atoms(config.courses):
+        # Statically infeasible rooms never enter the domain: labs over the
+        # 40-seat cap and theory rooms below expected enrollment would only
+        # surface later as hard violations.
+        if atom.session_type == "lab":
+            usable_rooms = [r for r in rooms_by_type["lab"] if r.capacity <= 40]
+        else:
+            need = courses_by_id[atom.course_id].expected_students
+            usable_rooms = [r for r in rooms_by_type["theory"]
+                            if need is None or r.capacity >= need]
         pairs: List[Tuple[TimeSlot, str]] = []
-        for d in config.common.days:
-            for i in range(1, config.common.slots_per_day + 1):
-                if (d, i) in forbidden:
-                    continue
-                if (d, i) not in availability.get(atom.instructor_id, set()):
-                    continue
-                for r in rooms_by_type[atom.session_type]:
-                    pairs.append((TimeSlot(d, i), r.id))
+        m = avail_mask.get(atom.instructor_id, 0)
+        while m:
+            b = m & -m
+            m ^= b
+            sid = b.bit_length() - 1
+            ts = interned_slot(days[sid // spd], sid % spd + 1)
+            for r in usable_rooms:
+                pairs.append((ts, r.id))
         domains[atom] = Domain(pairs=pairs)
     return domains
 
 def sort_atoms(atoms: List[SessionAtom], domains: Dict[SessionAtom, Domain], courses: Dict[str, Course]) -> List[SessionAtom]:
-    def k(a: SessionAtom):
-        c = courses[a.course_id]
-        return (
-            0 if c.required else 1,                       # required before electives
-            - (c.weekly_theory_hours + c.weekly_lab_hours), # heavier first
-            0 if a.session_type == "lab" else 1,           # labs earlier (scarce rooms)
-            len(domains[a].pairs),                         # MRV
-            - c.year,                                      # higher year priority
-        )
-    return sorted(atoms, key=k)
-
-def incremental_prune(schedule: Schedule,
-                      courses: Dict[str, Course],
-                      instructors: Dict[str, Instructor],
-                      rooms: Dict[str, Room],
-                      common: BeePlanConfig.common.__class__) -> bool:
-    """
-    Early hard-pruning: room/instructor double-booking, forbidden slots,
-    daily theory cap, year overlap, lab-before-theory.
-    """
-    by_slot = schedule.by_slot()
-    forb = {(ts.day, ts.index) for ts in common.forbidden_slots}
-
-    for (day, idx), ps in by_slot.items():
-        seen_rooms = set(); seen_instr = set(); years = []
-        for p in ps:
-            if (day, idx) in forb: return True
-            if p.room_id in seen_rooms: return True
-            seen_rooms.add(p.room_id)
-            if p.atom.instructor_id in seen_instr: return True
-            seen_instr.add(p.atom.instructor_id)
-            years.append(courses[p.atom.course_id].year)
-        if len(years) != len(set(years)): return True
-
-    theory_per_day: Dict[Tuple[str, str], int] = {}
-    earliest_t: Dict[str, int] = {}; earliest_l: Dict[str, int] = {}
-    for p in schedule.placements:
-        if p.atom.session_type == "theory":
-            theory_per_day[(p.atom.instructor_id, p.slot.day)] = theory_per_day.get((p.atom.instructor_id, p.slot.day), 0) + 1
-            earliest_t[p.atom.course_id] = min(earliest_t.get(p.atom.course_id, p.slot.index), p.slot.index)
-        else:
-            earliest_l[p.atom.course_id] = min(earliest_l.get(p.atom.course_id, p.slot.index), p.slot.index)
-    for (ins, day), count in theory_per_day.items():
-        if count > instructors[ins].max_daily_theory_hours: return True
-    for cid, lidx in earliest_l.items():
-        tidx = earliest_t.get(cid)
-        if tidx is None or lidx <= tidx: return True
-
-    return False
+    # Per-course part of the key computed once, not per atom comparison.
+    course_key = {c.id: (0 if c.required else 1,              # required before electives
+                         -(c.weekly_theory_hours + c.weekly_lab_hours),  # heavier first
+                         -c.year)                             # higher year priority
+                  for c in courses.values()}
+    # Keys are materialized in one pass and sorted as plain tuples; no key
+    # callable, no dict hits during the sort itself.
+    keyed = []
+    for a in atoms:
+        req, load, year = course_key[a.course_id]
+        keyed.append(((req,
+                       load,
+                       0 if a.session_type == "lab" else 1,  # labs earlier (scarce rooms)
+                       len(domains[a].pairs),                # MRV
+                       year), a))
+    keyed.sort(key=lambda kv: kv[0])
+    return [a for _, a in keyed]
 
 def generate(config: BeePlanConfig, step_limit: int = 400000) -> ScheduleResult:
     try:
@@ -113,38 +113,231 @@ def generate(config: BeePlanConfig, step_limit: int = 400000) -> ScheduleResult:
     try:
         domains = compute_domains(config)
         atoms = sort_atoms(list(domains.keys()), domains, courses)
-        used_room_slot: set[Tuple[str, str, int]] = set()
-        used_instr_slot: set[Tuple[str, str, int]] = set()
+        # One bit per (day, slot) cell; occupancy test is a single integer AND.
+        # Instructors and rooms get dense ordinals so the hot state lives in
+        # flat lists instead of string-keyed dicts.
+        day_index = {d: k for k, d in enumerate(config.common.days)}
+        slots_per_day = config.common.slots_per_day
+        instr_idx = {ins.id: k for k, ins in enumerate(config.instructors)}
+        room_ord = {r.id: k for k, r in enumerate(config.rooms)}
+        forbidden = config.common.forbidden_set()
+        max_daily = [ins.max_daily_theory_hours for ins in config.instructors]
+        # Integer state precomputed once: each candidate carries its room
+        # ordinal and grid bit. Sorted here once (earlier days and slots
+        # first, balanced room usage) instead of on every visit of the atom.
+        # Ordering by day ordinal, not string: "Fri" < "Mon" alphabetically,
+        # which used to bias the search toward Friday.
+        # The last element keys free_rooms below: cell ordinal with the
+        # session type in the low bit.
+        candidates_of: Dict[SessionAtom, List[Tuple[TimeSlot, str, int, int, int]]] = {}
+        for a, dom in domains.items():
+            is_lab = 1 if a.session_type == "lab" else 0
+            cands = []
+            for slot, room_id in dom.pairs:
+                sid = day_index[slot.day] * slots_per_day + slot.index - 1
+                cands.append((slot, room_id, room_ord[room_id], 1 << sid, (sid << 1) | is_lab))
+            cands.sort(key=lambda pr: (day_index[pr[0].day], pr[0].index, pr[1]))
+            candidates_of[a] = cands
+        atom_instr = {a: instr_idx[a.instructor_id] for a in atoms}
+        room_mask: List[int] = [0] * len(config.rooms)
+        instr_mask: List[int] = [0] * len(config.instructors)
+        # Hard-prune state maintained in O(1) per placement instead of
+        # rescanning the schedule on every probe: per-year occupancy shares
+        # the grid bits, daily theory hours live in a flat instructor-by-day
+        # list. Forbidden slots and double-bookings need no extra state —
+        # domains exclude the former, the masks above catch the latter.
+        n_days = len(config.common.days)
+        year_mask: List[int] = [0] * (1 + max((a.year for a in atoms), default=0))
+        theory_cnt: List[int] = [0] * (len(config.instructors) * n_days)
+        # Free rooms of each type per grid cell, indexed (cell << 1) | is_lab.
+        # Value ordering prefers cells where the needed room type is least
+        # contended, which spreads sessions instead of piling onto one slot.
+        n_theory_rooms = sum(1 for r in config.rooms if r.type == "theory")
+        free_rooms: List[int] = [n_theory_rooms,
+                                 len(config.rooms) - n_theory_rooms] * (n_days * slots_per_day)
+
+        # Hours within one (course, type) are interchangeable, so the search
+        # works on one representative atom with an instance count instead of
+        # k identical variables. Symmetry break: each further instance may
+        # only take candidates strictly after the previous instance's pick
+        # in the canonical presort, so every k-subset is enumerated once.
+        mult = Counter(build_atoms(config.courses))
+        need: Dict[SessionAtom, int] = dict(mult)
+        pos_stack: Dict[SessionAtom, List[int]] = {a: [] for a in atoms}
+        # Static order is kept as the tie-break for the dynamic selection below.
+        static_rank = {a: j for j, a in enumerate(atoms)}
+        remaining: Set[SessionAtom] = set(atoms)
+        # Forward check: an instructor must keep at least as many free
+        # availability cells as they have atoms left to place.
+        avail_cells: List[int] = [sum(1 for ts in ins.availability
+                                      if (ts.day, ts.index) not in forbidden)
+                                  for ins in config.instructors]
+        pending: List[int] = [0] * len(config.instructors)
+        for a, k in mult.items():
+            pending[atom_instr[a]] += k
+
+        # Arithmetic feasibility gate: if demand provably exceeds supply for
+        # a room type or an instructor, report that instead of burning the
+        # step budget on a search that cannot succeed.
+        theory_demand = sum(c.weekly_theory_hours for c in config.courses)
+        lab_demand = sum(c.weekly_lab_hours for c in config.courses)
+        free_cells = n_days * slots_per_day - sum(
+            1 for d, i in forbidden if d in day_index and 1 <= i <= slots_per_day)
+        n_lab_rooms = len(config.rooms) - n_theory_rooms
+        infeasible: List[Violation] = []
+        if theory_demand > n_theory_rooms * free_cells:
+            infeasible.append(Violation(
+                "INFEASIBLE_CAPACITY",
+                f"{theory_demand} theory hours exceed {n_theory_rooms} theory rooms x {free_cells} free slots",
+                severity="hard"))
+        if lab_demand > n_lab_rooms * free_cells:
+            infeasible.append(Violation(
+                "INFEASIBLE_CAPACITY",
+                f"{lab_demand} lab hours exceed {n_lab_rooms} lab rooms x {free_cells} free slots",
+                severity="hard"))
+        for k, ins in enumerate(config.instructors):
+            if pending[k] > avail_cells[k]:
+                infeasible.append(Violation(
+                    "INFEASIBLE_CAPACITY",
+                    f"Instructor {ins.id} needs {pending[k]} hours but is available for {avail_cells[k]}",
+                    severity="hard", instructor_id=ins.id))
+        if infeasible:
+            return ScheduleResult(schedule=schedule, violations=infeasible, warnings=[],
+                                  attempts=0, complete=False)
+        # Earliest theory/lab slot index per course, maintained incrementally
+        # (with exact undo) so the prune never rescans the placement list.
+        earliest_t: Dict[str, int] = {}
+        earliest_l: Dict[str, int] = {}
 
-        def place(i: int) -> bool:
+        def _restore_earliest(undo) -> None:
+            track, cid, prev = undo
+            if prev is None:
+                del track[cid]
+            else:
+                track[cid] = prev
+
+        # Each frame: [atom, candidate iterator, hoisted instructor mask,
+        # (room_ord, bit, earliest-undo, theory-count-key, free-rooms-key)
+        # of the applied assignment, or None].
+        frames: List[list] = []
+
+        def push_next() -> int:
+            """Pick and push the next atom. 1 = all placed, 0 = pushed, -1 = dead end."""
             nonlocal attempts
             attempts += 1
             if attempts > step_limit:
-                return False
-            if i == len(atoms):
-                return True
-            a = atoms[i]
-            # slight bias: earlier slots, balanced room usage
-            candidates = sorted(domains[a].pairs, key=lambda pr: (pr[0].day, pr[0].index, pr[1]))
-            for slot, room_id in candidates:
-                if (room_id, slot.day, slot.index) in used_room_slot:
-                    continue
-                if (a.instructor_id, slot.day, slot.index) in used_instr_slot:
-                    continue
-                schedule.placements.append(Placement(a, slot, room_id))
-                used_room_slot.add((room_id, slot.day, slot.index))
-                used_instr_slot.add((a.instructor_id, slot.day, slot.index))
-
-                if not incremental_prune(schedule, courses, instructors, rooms, config.common):
-                    if place(i + 1):
-                        return True
-
-                schedule.placements.pop()
-                used_room_slot.remove((room_id, slot.day, slot.index))
-                used_instr_slot.remove((a.instructor_id, slot.day, slot.index))
-            return False
-
-        complete = place(0)
+                return -1
+            if not remaining:
+                return 1
+            # Fail-first: place the atom with the fewest feasible candidates
+            # under the current occupancy masks; an empty domain is a dead end.
+            # Instructor and year masks share the grid-bit layout, so both
+            # conflicts collapse into one OR before the scan.
+            best = None
+            best_key = None
+            for cand in remaining:
+                cmask = instr_mask[atom_instr[cand]] | year_mask[cand.year]
+                lst = candidates_of[cand]
+                sp = pos_stack[cand]
+                n = 0
+                for j in range(sp[-1] + 1 if sp else 0, len(lst)):
+                    ridx = lst[j][2]; bit = lst[j][3]
+                    if not (cmask & bit) and not (room_mask[ridx] & bit):
+                        n += 1
+                if n < need[cand]:
+                    return -1
+                key = (n, static_rank[cand])
+                if best_key is None or key < best_key:
+                    best, best_key = cand, key
+            a = best
+            need[a] -= 1
+            if not need[a]:
+                remaining.discard(a)
+            pending[atom_instr[a]] -= 1
+            # Candidate order is fixed at frame creation: least-contended
+            # cells first, with the static day/index/room presort as the
+            # stable tie-break. The iterator yields canonical positions so
+            # the strictly-after rule above can be enforced cheaply.
+            lst = candidates_of[a]
+            sp = pos_stack[a]
+            start = sp[-1] + 1 if sp else 0
+            order = sorted(range(start, len(lst)), key=lambda j: -free_rooms[lst[j][4]])
+            # The instructor mask is loop-invariant within a frame: every
+            # explored subtree restores the masks before control returns.
+            frames.append([a, iter(order), instr_mask[atom_instr[a]], None])
+            return 0
+
+        status = push_next()
+        while frames and status != 1:
+            frame = frames[-1]
+            a, it, imask, applied = frame
+            ins = atom_instr[a]
+            ay = a.year
+            if applied is not None:
+                ridx, bit, undo, tkey, fkey = applied
+                schedule.pop_last()
+                room_mask[ridx] ^= bit
+                instr_mask[ins] ^= bit
+                year_mask[ay] ^= bit
+                free_rooms[fkey] += 1
+                pos_stack[a].pop()
+                if tkey >= 0:
+                    theory_cnt[tkey] -= 1
+                if undo is not None:
+                    _restore_earliest(undo)
+                frame[3] = None
+            status = -1
+            cid = a.course_id
+            is_theory = a.session_type == "theory"
+            track = earliest_t if is_theory else earliest_l
+            cap = max_daily[ins]
+            ins_base = ins * n_days
+            # Forward check is frame-invariant (imask and pending don't move
+            # while this frame owns control), so one failed test skips the
+            # whole candidate loop.
+            if avail_cells[ins] - imask.bit_count() - 1 >= pending[ins]:
+                cands_a = candidates_of[a]
+                for j in it:
+                    slot, room_id, ridx, bit, fkey = cands_a[j]
+                    # All hard checks run against O(1) state before anything
+                    # is applied; rejected candidates touch nothing.
+                    if imask & bit or room_mask[ridx] & bit or year_mask[ay] & bit:
+                        continue
+                    if is_theory:
+                        tkey = ins_base + day_index[slot.day]
+                        if theory_cnt[tkey] >= cap:
+                            continue
+                    else:
+                        tidx = earliest_t.get(cid)
+                        if tidx is None or slot.index <= tidx:
+                            continue
+                        tkey = -1
+                    schedule.add(Placement(a, slot, room_id))
+                    room_mask[ridx] |= bit
+                    instr_mask[ins] |= bit
+                    year_mask[ay] |= bit
+                    free_rooms[fkey] -= 1
+                    pos_stack[a].append(j)
+                    if tkey >= 0:
+                        theory_cnt[tkey] += 1
+                    prev = track.get(cid)
+                    if prev is None or slot.index < prev:
+                        track[cid] = slot.index
+                        undo = (track, cid, prev)
+                    else:
+                        undo = None
+                    frame[3] = (ridx, bit, undo, tkey, fkey)
+                    break
+            if frame[3] is None:
+                # candidates exhausted: give the instance back and backtrack
+                frames.pop()
+                pending[ins] += 1
+                need[a] += 1
+                remaining.add(a)
+                continue
+            status = push_next()
+
+        complete = status == 1
         violations = collect_violations(schedule, courses, instructors, rooms, config.common)
         hard = any(v.severity == "hard" for v in violations)
         complete = complete and not hard
@@ -2,6 +2,10 @@
 from typing import List, Dict, Tuple
 from .models import CommonSchedule, TimeSlot
 
+# Canonical week; hot paths use DAY_INDEX ordinals instead of comparing strings.
+DAYS: Tuple[str, ...] = ("Mon", "Tue", "Wed", "Thu", "Fri")
+DAY_INDEX: Dict[str, int] = {d: i for i, d in enumerate(DAYS)}
+
 # Çankaya slot times (index 1..8)
 SLOT_TIMES: Dict[int, Tuple[str, str]] = {
     1: ("09:30", "10:20"),
@@ -18,13 +22,23 @@ def common_schedule_cankaya(slots_per_day: int = 8) -> CommonSchedule:
     """
     Çankaya: Mon..Fri grid; Friday exam block 13:20–15:10 overlaps slots 5 and 6.
     """
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+    days = list(DAYS)
     forbidden = [TimeSlot(day="Fri", index=5), TimeSlot(day="Fri", index=6)]
     return CommonSchedule(days=days, slots_per_day=slots_per_day, forbidden_slots=forbidden)
 
+# TimeSlot is frozen, so the ~40 grid cells can share one instance each.
+_SLOT_POOL: Dict[Tuple[str, int], TimeSlot] = {}
+
+def interned_slot(day: str, index: int) -> TimeSlot:
+    key = (day, index)
+    ts = _SLOT_POOL.get(key)
+    if ts is None:
+        ts = _SLOT_POOL[key] = TimeSlot(day, index)
+    return ts
+
 def enumerate_all_slots(common: CommonSchedule) -> List[TimeSlot]:
     forb = {(ts.day, ts.index) for ts in common.forbidden_slots}
-    return [TimeSlot(d, i)
+    return [interned_slot(d, i)
             for d in common.days
             for i in range(1, common.slots_per_day + 1)
             if (d, i) not in forb]
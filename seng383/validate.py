@@ -3,41 +3,55 @@ from typing import Set
 from .models import BeePlanConfig, TimeSlot
 from .errors import InvalidInputError
 
+# Built once at import instead of as a fresh set literal per loop iteration.
+VALID_YEARS = frozenset({1, 2, 3, 4})
+VALID_ROOM_TYPES = frozenset({"theory", "lab"})
+
 def validate_config(config: BeePlanConfig) -> None:
     if not config.common.days or config.common.slots_per_day <= 0:
         raise InvalidInputError("Days and slots_per_day must be set.")
-    valid = {(d, i) for d in config.common.days for i in range(1, config.common.slots_per_day + 1)}
-    # Courses
-    seen_courses: Set[str] = set()
-    for c in config.courses:
-        if not c.id or c.year not in {1, 2, 3, 4}:
-            raise InvalidInputError(f"Course '{c.name}' invalid id/year.")
-        if c.weekly_theory_hours < 0 or c.weekly_lab_hours < 0:
-            raise InvalidInputError(f"Course {c.id} has negative hours.")
-        if c.id in seen_courses:
-            raise InvalidInputError(f"Duplicate course id {c.id}.")
-        seen_courses.add(c.id)
-    # Instructors
+    # The grid is a rectangle, so membership needs no materialized set at
+    # all: a day-set probe plus an index bound check covers it.
+    days_set = frozenset(config.common.days)
+    spd = config.common.slots_per_day
+    # Instructors and rooms first: they have no dependencies, and the course
+    # pass can then check instructor references inline instead of walking
+    # config.courses a second time.
     seen_instructors: Set[str] = set()
+    add_instructor = seen_instructors.add
     for i in config.instructors:
         if not i.id or not i.name:
             raise InvalidInputError("Instructor missing id/name.")
+        if i.id in seen_instructors:
+            raise InvalidInputError(f"Duplicate instructor id {i.id}.")
         if not i.availability:
             raise InvalidInputError(f"Instructor {i.id} has empty availability.")
         for ts in i.availability:
-            if (ts.day, ts.index) not in valid:
+            if ts.day not in days_set or not 1 <= ts.index <= spd:
                 raise InvalidInputError(f"Instructor {i.id} availability out of grid: {ts.day}-{ts.index}.")
-        seen_instructors.add(i.id)
+        add_instructor(i.id)
     # Rooms
     seen_rooms: Set[str] = set()
+    add_room = seen_rooms.add
     for r in config.rooms:
-        if not r.id or r.capacity <= 0 or r.type not in {"theory", "lab"}:
+        if not r.id or r.capacity <= 0 or r.type not in VALID_ROOM_TYPES:
             raise InvalidInputError(f"Room {r.id} invalid definition.")
-        seen_rooms.add(r.id)
-    # References
+        if r.id in seen_rooms:
+            raise InvalidInputError(f"Duplicate room id {r.id}.")
+        add_room(r.id)
+    # Courses, including referential integrity, in one pass
+    seen_courses: Set[str] = set()
+    add_course = seen_courses.add
     for c in config.courses:
+        if not c.id or c.year not in VALID_YEARS:
+            raise InvalidInputError(f"Course '{c.name}' invalid id/year.")
+        if c.weekly_theory_hours < 0 or c.weekly_lab_hours < 0:
+            raise InvalidInputError(f"Course {c.id} has negative hours.")
+        if c.id in seen_courses:
+            raise InvalidInputError(f"Duplicate course id {c.id}.")
+        add_course(c.id)
         if c.instructor_id not in seen_instructors:
             raise InvalidInputError(f"Course {c.id} references unknown instructor {c.instructor_id}.")
     for ts in config.common.forbidden_slots:
-        if (ts.day, ts.index) not in valid:
+        if ts.day not in days_set or not 1 <= ts.index <= spd:
             raise InvalidInputError(f"Forbidden slot out of grid: {ts.day}-{ts.index}.")